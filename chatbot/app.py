@@ -4,14 +4,22 @@ import os
 import json
 import subprocess
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, Response
+from flask import Flask, render_template, request, jsonify, Response, send_from_directory
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from indexer import build_index, get_index
-from searcher import search, get_article
+from indexer import build_index, get_index, get_generation, load_glossary_terms
+from searcher import (search, search_page, search_many, iter_search_many,
+                      get_article, FILTER_FIELDS)
+from suggester import SUGGEST_FILE, build_suggest_index, get_suggest_index
+from watcher import IndexWatcher
+from preload import preload_index, memory_report
+from renderer import attach_html, attach_html_all
+from http_cache import cached_response
+from exporter import EXPORT_DIR
 from ai_handler import generate_ai_response, refine_question, generate_related_questions
+from pipeline import answer_stream
 
 # Taiwan Judicial Decisions Skill Path
 SKILL_PATH = Path.home() / ".claude" / "skills" / "taiwan-judicial-decisions"
@@ -20,7 +28,47 @@ SCRIPTS_PATH = SKILL_PATH / "scripts"
 app = Flask(__name__)
 
 KB_ROOT = Path(__file__).resolve().parent.parent
-INDEX_DIR = Path(__file__).resolve().parent / "multi_law_index"  # 使用多法規索引
+# 預設使用多法規索引；即時監看（KB_WATCH）需改用 INDEX_DIR=index_data
+INDEX_DIR = Path(os.environ.get("INDEX_DIR", Path(__file__).resolve().parent / "multi_law_index"))
+
+# Set PRELOAD_INDEX=1 to serve from an in-memory copy loaded at import time,
+# i.e. once in the master process when run under gunicorn --preload
+PRELOADED = preload_index(INDEX_DIR) if os.environ.get("PRELOAD_INDEX") else None
+
+# Upper bound on threads a single batch search request may use
+MAX_BATCH_WORKERS = 8
+
+# Largest number of queries accepted by /api/search/batch
+MAX_BATCH_QUERIES = 100
+
+# Largest page size accepted by /api/search
+MAX_PAGE_SIZE = 50
+
+# Largest number of completions returned by /api/suggest
+MAX_SUGGESTIONS = 20
+
+
+def open_index():
+    """Return the preloaded in-memory index if enabled, else open it from disk."""
+    if PRELOADED is not None:
+        return PRELOADED.ix
+    return get_index(INDEX_DIR)
+
+
+def index_generation():
+    """Generation of the index being served; read endpoints key ETags on it."""
+    if PRELOADED is not None:
+        return PRELOADED.generation
+    return get_generation(INDEX_DIR)
+
+
+def suggest_generation():
+    """ETag key for /api/suggest; the watcher rewrites suggest.json in place."""
+    try:
+        mtime = (INDEX_DIR / SUGGEST_FILE).stat().st_mtime_ns
+    except OSError:
+        mtime = 0
+    return f"{index_generation()}:{mtime}"
 
 
 @app.route("/")
@@ -41,33 +89,133 @@ def test_commercial_law():
     return render_template("test_commercial_law.html")
 
 
+@app.route("/static_export/<path:filename>")
+def static_export(filename):
+    """Serve the bundle written by exporter.py for offline search in the browser.
+
+    Versioned files never change and are cached for good; latest.json is
+    revalidated so clients pick up a new export. A CDN can serve the same
+    directory instead.
+    """
+    response = send_from_directory(EXPORT_DIR, filename)
+    if filename == "latest.json":
+        response.headers["Cache-Control"] = "no-cache"
+    else:
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 @app.route("/api/status")
+@cached_response(index_generation)
 def status():
-    ix = get_index(INDEX_DIR)
+    ix = open_index()
     ai_available = bool(os.environ.get("DEEPSEEK_API_KEY"))
     doc_count = ix.doc_count() if ix else 0
     return jsonify({
         "indexed_docs": doc_count,
         "ai_available": ai_available,
+        "preloaded": PRELOADED is not None,
     })
 
 
+@app.route("/api/memory")
+def api_memory():
+    """Resident memory of the worker serving this request (not cached)."""
+    return jsonify(memory_report())
+
+
 @app.route("/api/search")
+@cached_response(index_generation)
 def api_search():
     q = request.args.get("q", "").strip()
     if not q:
         return jsonify({"results": []})
-    ix = get_index(INDEX_DIR)
-    results = search(ix, q)
-    return jsonify({"query": q, "results": results})
+
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "參數格式錯誤"}), 400
+
+    cursor = request.args.get("cursor") or None
+    filters = {name: request.args.get(name, "").strip() for name in FILTER_FIELDS}
+
+    ix = open_index()
+    try:
+        page = search_page(ix, q, limit=limit, filters=filters, cursor=cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    attach_html_all(page["results"], INDEX_DIR)
+    return jsonify({"query": q, **page})
+
+
+@app.route("/api/search/batch", methods=["POST"])
+def api_search_batch():
+    """Run many searches against one shared searcher."""
+    data = request.get_json()
+    queries = data.get("queries", [])
+    limit = data.get("limit", 10)
+    workers = data.get("workers", 1)
+
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "請提供查詢列表"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"error": f"查詢數量不可超過 {MAX_BATCH_QUERIES}"}), 400
+    if not all(isinstance(q, str) for q in queries):
+        return jsonify({"error": "查詢必須為字串"}), 400
+
+    try:
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        workers = min(max(int(workers), 1), MAX_BATCH_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({"error": "參數格式錯誤"}), 400
+
+    queries = [q.strip() for q in queries]
+    ix = open_index()
+
+    if data.get("stream"):
+        def generate():
+            batch = iter_search_many(ix, queries, limit=limit, workers=workers)
+            for i, (q, results) in enumerate(zip(queries, batch)):
+                line = {"index": i, "query": q, "results": results}
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+
+        return Response(generate(), mimetype="application/x-ndjson")
+
+    batch = search_many(ix, queries, limit=limit, workers=workers)
+    return jsonify({
+        "count": len(queries),
+        "results": [{"query": q, "results": r} for q, r in zip(queries, batch)],
+    })
+
+
+@app.route("/api/suggest")
+@cached_response(suggest_generation)
+def api_suggest():
+    """Typeahead completions served from the prefix table."""
+    q = request.args.get("q", "").strip()
+    try:
+        limit = min(max(int(request.args.get("limit", 8)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        return jsonify({"error": "參數格式錯誤"}), 400
+
+    # Built at startup or offline (python suggester.py), never per request
+    suggester = get_suggest_index(INDEX_DIR) if q else None
+    suggestions = suggester.suggest(q, limit) if suggester else []
+    return jsonify({"query": q, "suggestions": suggestions})
 
 
 @app.route("/api/article/<path:number>")
+@cached_response(index_generation, store=True)
 def api_article(number):
-    ix = get_index(INDEX_DIR)
+    if PRELOADED is not None:
+        payload = PRELOADED.article_payload(number)
+        if payload is not None:
+            return Response(payload, mimetype="application/json")
+
+    ix = open_index()
     result = get_article(ix, number)
     if result:
-        return jsonify(result)
+        return jsonify(attach_html(result, INDEX_DIR))
     return jsonify({"error": "找不到該條文"}), 404
 
 
@@ -264,17 +412,23 @@ def api_chat():
     message = data.get("message", "").strip()
     mode = data.get("mode", "search")
     history = data.get("history", [])
+    refine = data.get("refine", False)
 
     if not message:
         return jsonify({"error": "請輸入問題"}), 400
 
-    ix = get_index(INDEX_DIR)
+    ix = open_index()
 
     if mode == "ai" and os.environ.get("DEEPSEEK_API_KEY"):
-        results = search(ix, message, limit=8)
+        if refine:
+            # Refinement, retrieval and generation in one streamed request
+            chunks = answer_stream(ix, message, history, limit=8)
+        else:
+            results = search(ix, message, limit=8)
+            chunks = generate_ai_response(message, results, history)
 
         def generate():
-            for chunk in generate_ai_response(message, results, history):
+            for chunk in chunks:
                 yield f"data: {chunk}\n\n"
             yield "data: [DONE]\n\n"
 
@@ -284,7 +438,7 @@ def api_chat():
             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
     else:
-        results = search(ix, message)
+        results = attach_html_all(search(ix, message), INDEX_DIR)
         return jsonify({"mode": "search", "query": message, "results": results})
 
 
@@ -294,7 +448,7 @@ if __name__ == "__main__":
     print("  涵蓋 20 部商事法律")
     print("=" * 50)
 
-    ix = get_index(INDEX_DIR)
+    ix = open_index()
     if ix is None or ix.doc_count() == 0:
         print("\n索引未建立，請先執行: python ../build_multi_law_index.py")
         print("或使用舊版單一法規模式")
@@ -302,6 +456,23 @@ if __name__ == "__main__":
         sys.exit(1)
     else:
         print(f"已載入索引，共 {ix.doc_count()} 個文件")
+        if get_suggest_index(INDEX_DIR) is None:
+            count = build_suggest_index(ix, KB_ROOT, INDEX_DIR, load_glossary_terms(KB_ROOT))
+            print(f"已建立自動完成詞表，共 {count} 筆")
+
+    if PRELOADED is not None:
+        print(f"已預載索引至記憶體（generation {PRELOADED.generation}，{len(PRELOADED.articles)} 條）")
+        if os.environ.get("KB_WATCH"):
+            print("注意：預載模式使用啟動時的索引快照，監看更新需重新啟動後才會生效")
+
+    # With the debug reloader, only the serving child process should watch
+    if os.environ.get("KB_WATCH") and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        try:
+            IndexWatcher(KB_ROOT, INDEX_DIR).start()
+            print("已啟用知識庫監看（KB_WATCH），變更將自動更新索引")
+        except ValueError as e:
+            print(f"無法啟用監看：{e}")
+            print("即時監看僅支援 indexer.py 建立的索引，請先執行 python watcher.py 並設定 INDEX_DIR=index_data")
 
     if os.environ.get("DEEPSEEK_API_KEY"):
         print("AI 模式已啟用 (DeepSeek)")
@@ -0,0 +1,185 @@
+"""靜態匯出：將索引輸出為帶版本與內容雜湊的 JSON 檔，供 CDN 與離線瀏覽搜尋"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+
+from indexer import get_index
+from renderer import attach_html
+from searcher import format_hit
+from suggester import SUGGEST_FILE
+
+
+INDEX_DIR = Path(__file__).resolve().parent / "multi_law_index"
+EXPORT_DIR = Path(__file__).resolve().parent / "static_export"
+
+# Field whose jieba tokens make up the client-side inverted index
+SEARCH_FIELD = "full_text"
+
+# Skip punctuation/markup tokens such as "#" or "|"
+WORD_RE = re.compile(r'\w')
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()[:10]
+
+
+def write_hashed(out_dir, name, obj):
+    """Write ``obj`` as ``<name>.<hash>.json`` and return the file name."""
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    filename = f"{name}.{content_hash(data)}.json"
+    path = out_dir / filename
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return filename
+
+
+def shard_name(rel_path):
+    """Chapter directory (e.g. "01-總則") or "study" for a knowledge-base path."""
+    return Path(rel_path).parts[0]
+
+
+class _StoredHit(dict):
+    """Stored fields that format_hit can read like a search hit."""
+
+    score = 0
+
+
+def collect_documents(ix, index_dir):
+    """Return {docnum: (shard, record)} for every live document."""
+    documents = {}
+    with ix.searcher() as searcher:
+        reader = searcher.reader()
+        for docnum, stored in reader.iter_docs():
+            hit = _StoredHit(stored)
+            record = attach_html(format_hit(hit), index_dir)
+            record.pop("score", None)
+            if record["doc_type"] != "article":
+                record["raw_content"] = stored.get("raw_content", "")
+            documents[docnum] = (shard_name(record["path"]), record)
+    return documents
+
+
+def build_inverted_index(ix, docids):
+    """Compact postings from the jieba-tokenized search field.
+
+    ``terms`` maps each lowercased token to a flat [doc, tf, doc, tf, ...]
+    list, with case variants such as "BOT" and "bot" merged so the client can
+    match case-insensitively; ``lengths`` holds per-document token counts for
+    BM25 on the client.
+    """
+    merged = {}
+    with ix.searcher() as searcher:
+        reader = searcher.reader()
+        for term in reader.field_terms(SEARCH_FIELD):
+            if not WORD_RE.search(term):
+                continue
+            freqs = merged.setdefault(term.lower(), {})
+            for docnum, freq in reader.postings(SEARCH_FIELD, term).items_as("frequency"):
+                if docnum in docids:
+                    docid = docids[docnum]
+                    freqs[docid] = freqs.get(docid, 0) + freq
+
+        lengths = [0] * len(docids)
+        for docnum, docid in docids.items():
+            lengths[docid] = reader.doc_field_length(docnum, SEARCH_FIELD)
+
+    terms = {}
+    for term, freqs in merged.items():
+        if freqs:
+            terms[term] = [n for docid in sorted(freqs) for n in (docid, freqs[docid])]
+
+    return {"field": SEARCH_FIELD, "terms": terms, "lengths": lengths}
+
+
+def export_static(index_dir, out_root):
+    """Export shards, inverted index and manifest; return the version string.
+
+    Files go to ``<out_root>/<version>/`` and are never modified afterwards,
+    so they can be cached forever. ``<out_root>/latest.json`` points at the
+    newest version.
+    """
+    index_dir = Path(index_dir)
+    out_root = Path(out_root)
+    ix = get_index(index_dir)
+    if ix is None:
+        raise FileNotFoundError(f"找不到索引：{index_dir}")
+
+    documents = collect_documents(ix, index_dir)
+
+    # Group documents into per-chapter shards, in path order
+    shards = {}
+    for docnum in sorted(documents, key=lambda d: documents[d][1]["path"]):
+        shard, record = documents[docnum]
+        shards.setdefault(shard, []).append((docnum, record))
+
+    docids = {}
+    docs = []
+    for shard, entries in shards.items():
+        for position, (docnum, record) in enumerate(entries):
+            docids[docnum] = len(docs)
+            docs.append([shard, position, record["title"], record["path"]])
+
+    # A fresh staging directory per export, so leftovers from a crashed or
+    # concurrent run can never end up inside a published version
+    out_root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=out_root))
+    # mkdtemp creates 0700; published versions must be readable by the web server
+    staging.chmod(0o755)
+    try:
+        version = _write_version(ix, index_dir, staging, shards, docids, docs)
+        version_dir = out_root / version
+        if not version_dir.exists():
+            try:
+                staging.rename(version_dir)
+            except OSError:
+                # Another export published the same version first
+                pass
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    latest = out_root / "latest.json"
+    tmp_latest = out_root / f"latest.{os.getpid()}.tmp"
+    tmp_latest.write_text(json.dumps({"version": version}), encoding="utf-8")
+    tmp_latest.replace(latest)
+    return version
+
+
+def _write_version(ix, index_dir, staging, shards, docids, docs):
+    """Write all bundle files into ``staging`` and return the version."""
+    manifest = {"shards": {}, "doc_count": len(docs)}
+    for shard, entries in shards.items():
+        manifest["shards"][shard] = write_hashed(
+            staging, f"articles/{shard}", {"shard": shard, "docs": [r for _, r in entries]})
+
+    search_index = build_inverted_index(ix, docids)
+    search_index["docs"] = docs
+    manifest["search"] = write_hashed(staging, "search/index", search_index)
+
+    suggest_path = index_dir / SUGGEST_FILE
+    if suggest_path.exists():
+        rows = json.loads(suggest_path.read_text(encoding="utf-8"))
+        manifest["suggest"] = write_hashed(staging, "search/suggest", rows)
+
+    # The version is derived from the content hashes, so unchanged data
+    # exports to the same version
+    version = content_hash(json.dumps(manifest, sort_keys=True).encode("utf-8"))
+    manifest["version"] = version
+    (staging / "manifest.json").write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="匯出靜態知識庫與前端搜尋索引")
+    parser.add_argument("--index-dir", default=str(INDEX_DIR))
+    parser.add_argument("--out", default=str(EXPORT_DIR))
+    args = parser.parse_args()
+
+    version = export_static(args.index_dir, args.out)
+    print(f"已匯出版本 {version} → {Path(args.out) / version}")
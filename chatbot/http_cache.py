@@ -0,0 +1,131 @@
+"""HTTP 快取：依索引版本產生 ETag、條件式 GET 與回應壓縮"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response, Response
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+
+# Read endpoints only change when the index does; let proxies reuse them
+# briefly and revalidate with If-None-Match afterwards
+CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Total bytes of encoded bodies kept per worker; small enough not to undo
+# the copy-on-write sharing of a preloaded index
+BODY_CACHE_BYTES = 4 * 1024 * 1024
+
+_body_cache = OrderedDict()
+_body_bytes = 0
+_body_lock = threading.Lock()
+
+
+def negotiate_encoding():
+    """Pick br, gzip or identity from the request's Accept-Encoding."""
+    accept = request.accept_encodings
+    if brotli is not None and accept["br"]:
+        return "br"
+    if accept["gzip"]:
+        return "gzip"
+    return "identity"
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=9)
+    if encoding == "gzip":
+        # Fixed mtime keeps the bytes identical for a given strong ETag
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+def make_etag(generation, encoding):
+    """Strong ETag for this request at ``generation``, one per encoding."""
+    raw = f"{generation}:{request.full_path}".encode("utf-8")
+    return f"{hashlib.sha1(raw).hexdigest()[:16]}-{encoding}"
+
+
+def _cache_get(etag):
+    with _body_lock:
+        entry = _body_cache.get(etag)
+        if entry is not None:
+            _body_cache.move_to_end(etag)
+        return entry
+
+
+def _cache_put(etag, entry):
+    global _body_bytes
+    size = len(entry[0])
+    if size > BODY_CACHE_BYTES:
+        return
+    with _body_lock:
+        old = _body_cache.pop(etag, None)
+        if old is not None:
+            _body_bytes -= len(old[0])
+        _body_cache[etag] = entry
+        _body_bytes += size
+        while _body_bytes > BODY_CACHE_BYTES:
+            _, evicted = _body_cache.popitem(last=False)
+            _body_bytes -= len(evicted[0])
+
+
+def _finish(response, etag, encoding):
+    """Add validator, caching and encoding headers to ``response``."""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+    if encoding != "identity" and response.status_code == 200:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def cached_response(get_generation, store=False):
+    """Decorate a read-only JSON view with ETag validation and compression.
+
+    ``get_generation`` returns the current index generation; when it changes
+    every ETag changes with it. With ``store``, successful encoded bodies go
+    into a byte-capped LRU so repeat requests for hot payloads skip the view
+    and compression.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            encoding = negotiate_encoding()
+            etag = make_etag(get_generation(), encoding)
+
+            if request.if_none_match.contains_weak(etag) or request.if_none_match.star_tag:
+                return _finish(Response(status=304), etag, encoding)
+
+            entry = _cache_get(etag) if store else None
+            if entry is not None:
+                body, mimetype, enc = entry
+                return _finish(Response(body, mimetype=mimetype), etag, enc)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+
+            # The ETag names the negotiated encoding even when a small body
+            # is sent uncompressed, so revalidation still matches next time
+            body = response.get_data()
+            if len(body) < MIN_COMPRESS_SIZE:
+                encoding = "identity"
+            body = compress(body, encoding)
+            response.set_data(body)
+
+            if store:
+                _cache_put(etag, (body, response.mimetype, encoding))
+            return _finish(response, etag, encoding)
+
+        return wrapper
+    return decorator
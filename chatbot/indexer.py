@@ -1,14 +1,19 @@
 """Markdown 知識庫解析器 + Whoosh 索引建立"""
 
+import os
 import re
 from pathlib import Path
 
 import frontmatter
 import jieba
-from whoosh import index
+from whoosh import index, writing
 from whoosh.fields import Schema, TEXT, ID, KEYWORD, STORED
 from whoosh.analysis import Tokenizer, Token
 
+from suggester import build_suggest_index
+from renderer import (write_fragments, render_article_fragments,
+                      render_study_fragments, remove_fragments, prune_fragments)
+
 
 class JiebaTokenizer(Tokenizer):
     """Whoosh tokenizer using jieba for Chinese text segmentation."""
@@ -63,16 +68,27 @@ def get_schema():
     )
 
 
+# Whoosh table-of-contents files, one per committed generation
+TOC_RE = re.compile(r'^_MAIN_(\d+)\.toc$')
+
+# Common legal terms added to the jieba dictionary before indexing
+COMMON_TERMS = ["股份有限公司", "有限公司", "無限公司", "兩合公司", "閉鎖性",
+                "董事會", "監察人", "股東會", "公司債", "發行新股", "清算",
+                "章程", "表決權", "特別股", "關係企業", "公司負責人",
+                "資本額", "股東名簿", "公開發行", "累積投票制"]
+
+
 def load_glossary_terms(kb_root):
-    """Load legal terms from glossary and add to jieba dictionary."""
+    """Load legal terms from glossary, add them to jieba and return them."""
     glossary_path = kb_root / "study" / "glossary.md"
     if not glossary_path.exists():
-        return
+        return []
 
     content = glossary_path.read_text(encoding="utf-8")
     terms = re.findall(r'\*\*(.+?)\*\*', content)
     for term in terms:
         jieba.add_word(term, freq=1000)
+    return terms
 
 
 def parse_sections(content):
@@ -104,8 +120,11 @@ def parse_related_articles(text):
     return related
 
 
-def index_article(writer, file_path, kb_root):
-    """Index a single article markdown file."""
+def index_article(writer, file_path, kb_root, index_dir=None):
+    """Index a single article markdown file.
+
+    If ``index_dir`` is given, its HTML fragments are pre-rendered there too.
+    """
     try:
         post = frontmatter.load(str(file_path), encoding="utf-8")
     except Exception:
@@ -134,6 +153,11 @@ def index_article(writer, file_path, kb_root):
     rel_path = str(file_path.relative_to(kb_root))
     full_text = f"{article_display} {legal_text} {explanation} {summary_text} {cases} {tags}"
 
+    if index_dir is not None:
+        shown = {"explanation": explanation, "summary": summary_text, "cases": cases}
+        write_fragments(index_dir, rel_path, content,
+                        lambda: render_article_fragments(legal_text, shown))
+
     writer.add_document(
         path=rel_path,
         article_number=article_num,
@@ -154,8 +178,8 @@ def index_article(writer, file_path, kb_root):
     )
 
 
-def index_study_file(writer, file_path, kb_root):
-    """Index a study resource file."""
+def index_study_file(writer, file_path, kb_root, index_dir=None):
+    """Index a study resource file, pre-rendering its HTML if ``index_dir`` is given."""
     try:
         content = file_path.read_text(encoding="utf-8")
     except Exception:
@@ -178,6 +202,10 @@ def index_study_file(writer, file_path, kb_root):
     elif "topic-guides" in str(file_path):
         doc_type = "guide"
 
+    if index_dir is not None:
+        write_fragments(index_dir, rel_path, content,
+                        lambda: render_study_fragments(content))
+
     writer.add_document(
         path=rel_path,
         article_number="",
@@ -198,52 +226,167 @@ def index_study_file(writer, file_path, kb_root):
     )
 
 
+def load_jieba_terms(kb_root):
+    """Add glossary and common legal terms to jieba; return the glossary terms."""
+    glossary_terms = load_glossary_terms(kb_root)
+    for term in COMMON_TERMS:
+        jieba.add_word(term, freq=1000)
+    return glossary_terms
+
+
+def iter_article_files(kb_root):
+    """Yield all article markdown files in the knowledge base."""
+    for md_file in sorted(kb_root.rglob("art-*.md")):
+        if "chatbot" in str(md_file):
+            continue
+        yield md_file
+
+
+def iter_study_files(kb_root):
+    """Yield all indexable study resource files."""
+    study_dir = kb_root / "study"
+    if study_dir.exists():
+        for md_file in study_dir.rglob("*.md"):
+            if md_file.name == "README.md":
+                continue
+            yield md_file
+
+
+def classify_file(file_path, kb_root):
+    """Return "article" or "study" for an indexable file, otherwise None."""
+    try:
+        rel_parts = file_path.relative_to(kb_root).parts
+    except ValueError:
+        return None
+    if file_path.suffix != ".md" or "chatbot" in rel_parts:
+        return None
+    if file_path.name.startswith("art-"):
+        return "article"
+    if rel_parts[0] == "study" and file_path.name != "README.md":
+        return "study"
+    return None
+
+
 def build_index(kb_root, index_dir):
     """Build the Whoosh search index from the knowledge base."""
     kb_root = Path(kb_root)
     index_dir = Path(index_dir)
 
-    # Load glossary terms into jieba
-    load_glossary_terms(kb_root)
-
-    # Add common legal terms
-    for term in ["股份有限公司", "有限公司", "無限公司", "兩合公司", "閉鎖性",
-                 "董事會", "監察人", "股東會", "公司債", "發行新股", "清算",
-                 "章程", "表決權", "特別股", "關係企業", "公司負責人",
-                 "資本額", "股東名簿", "公開發行", "累積投票制"]:
-        jieba.add_word(term, freq=1000)
+    # Load glossary and common legal terms into jieba
+    glossary_terms = load_jieba_terms(kb_root)
 
     # Create index directory
     index_dir.mkdir(parents=True, exist_ok=True)
 
+    # Rebuild an existing index in place rather than wiping it with create_in,
+    # so searches running during the build keep reading the old generation
     schema = get_schema()
-    ix = index.create_in(str(index_dir), schema)
+    ix = get_index(index_dir)
+    if ix is None or ix.schema.names() != schema.names():
+        ix = index.create_in(str(index_dir), schema)
     writer = ix.writer()
 
     # Index all article files
     article_count = 0
-    for md_file in sorted(kb_root.rglob("art-*.md")):
-        if "chatbot" in str(md_file):
-            continue
-        index_article(writer, md_file, kb_root)
+    rel_paths = []
+    for md_file in iter_article_files(kb_root):
+        index_article(writer, md_file, kb_root, index_dir)
+        rel_paths.append(md_file.relative_to(kb_root))
         article_count += 1
 
     # Index study files
     study_count = 0
-    study_dir = kb_root / "study"
-    if study_dir.exists():
-        for md_file in study_dir.rglob("*.md"):
-            if md_file.name == "README.md":
-                continue
-            index_study_file(writer, md_file, kb_root)
-            study_count += 1
+    for md_file in iter_study_files(kb_root):
+        index_study_file(writer, md_file, kb_root, index_dir)
+        rel_paths.append(md_file.relative_to(kb_root))
+        study_count += 1
 
-    writer.commit()
+    # Drop pre-rendered HTML of files that no longer exist
+    prune_fragments(index_dir, rel_paths)
+
+    # CLEAR drops the previous segments in the same commit, so readers switch
+    # to the new generation atomically
+    writer.commit(mergetype=writing.CLEAR)
     print(f"  條文檔案: {article_count}")
     print(f"  學習資源: {study_count}")
+
+    suggest_count = build_suggest_index(ix, kb_root, index_dir, glossary_terms)
+    print(f"  自動完成詞條: {suggest_count}")
+    return ix
+
+
+def check_schema(ix):
+    """Raise ValueError if ``ix`` was not built with this module's schema.
+
+    Indexes from other builders (e.g. the multi-law index, which adds
+    ``law_name``) must not be updated or rebuilt from this knowledge base.
+    """
+    expected = sorted(get_schema().names())
+    actual = sorted(ix.schema.names())
+    if actual != expected:
+        extra = sorted(set(actual) - set(expected))
+        raise ValueError(f"索引欄位與本建置程式不符（多出：{', '.join(extra) or '無'}），"
+                         f"請改用原建置程式重建")
+
+
+def update_index(kb_root, index_dir, paths):
+    """Re-index only the given files and commit them as one new generation.
+
+    Files that no longer exist are removed from the index. Searchers opened
+    before the commit keep reading the previous generation.
+    """
+    kb_root = Path(kb_root).resolve()
+    index_dir = Path(index_dir)
+
+    ix = get_index(index_dir)
+    if ix is None:
+        return build_index(kb_root, index_dir)
+    check_schema(ix)
+
+    glossary_terms = load_jieba_terms(kb_root)
+    writer = ix.writer(timeout=30.0)
+
+    updated = 0
+    for file_path in paths:
+        file_path = Path(file_path).resolve()
+        kind = classify_file(file_path, kb_root)
+        if kind is None:
+            continue
+
+        rel_path = str(file_path.relative_to(kb_root))
+        writer.delete_by_term("path", rel_path)
+        if file_path.exists():
+            if kind == "article":
+                index_article(writer, file_path, kb_root, index_dir)
+            else:
+                index_study_file(writer, file_path, kb_root, index_dir)
+        else:
+            remove_fragments(index_dir, rel_path)
+        updated += 1
+
+    if not updated:
+        writer.cancel()
+        return ix
+
+    writer.commit()
+    build_suggest_index(ix, kb_root, index_dir, glossary_terms)
     return ix
 
 
+def get_generation(index_dir):
+    """Return the latest committed index generation without opening it, or -1."""
+    generation = -1
+    try:
+        with os.scandir(index_dir) as entries:
+            for entry in entries:
+                m = TOC_RE.match(entry.name)
+                if m:
+                    generation = max(generation, int(m.group(1)))
+    except OSError:
+        pass
+    return generation
+
+
 def get_index(index_dir):
     """Open existing Whoosh index, or return None."""
     index_dir = Path(index_dir)
@@ -0,0 +1,86 @@
+"""AI 問答管線：問題優化與檢索並行，優化後問題差異夠大才補查，再串流生成回答"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from searcher import search, detect_article_number
+from ai_handler import refine_question, generate_ai_response
+
+
+# Refinement is an LLM round-trip that mostly waits on the network; size the
+# pool for the number of chats expected to be in flight at once
+REFINE_WORKERS = 32
+
+_refine_pool = ThreadPoolExecutor(max_workers=REFINE_WORKERS,
+                                  thread_name_prefix="refine")
+
+# Give up waiting for refinement after this many seconds and answer with
+# the original question; retrieval runs meanwhile, so most of it is overlapped
+REFINE_TIMEOUT = 10.0
+
+# Re-query only when the refined question shares less than this fraction
+# (Jaccard) of its search terms with the original
+MIN_TERM_OVERLAP = 0.6
+
+
+def query_terms(ix, text):
+    """Tokenize ``text`` with the index's full-text analyzer."""
+    return set(ix.schema["full_text"].process_text(text, mode="query"))
+
+
+def differs_meaningfully(ix, original, refined):
+    """True if the refined query would likely retrieve different documents."""
+    a = query_terms(ix, original)
+    b = query_terms(ix, refined)
+    if not a or not b:
+        return a != b
+    return len(a & b) / len(a | b) < MIN_TERM_OVERLAP
+
+
+def merge_results(primary, secondary, limit):
+    """Merge two result lists by path, keeping ``primary`` order first."""
+    merged = []
+    seen = set()
+    for r in primary + secondary:
+        if r.get("path") in seen:
+            continue
+        seen.add(r.get("path"))
+        merged.append(r)
+    return merged[:limit]
+
+
+def answer_stream(ix, query, history=None, limit=8):
+    """Refine and retrieve concurrently, then stream the AI answer.
+
+    Yields the same JSON chunks as generate_ai_response, preceded by a
+    ``{"original", "refined"}`` chunk when a refined question is used.
+    Refinement always starts alongside retrieval; it is dropped when the
+    query is an article-number lookup that hits an article, and abandoned if
+    it is not ready within REFINE_TIMEOUT seconds.
+    """
+    future = _refine_pool.submit(refine_question, query)
+
+    results = search(ix, query, limit=limit)
+
+    art_num = detect_article_number(query)
+    if art_num and any(r.get("article_number") == art_num for r in results):
+        # The number found its article; a rewritten question adds nothing
+        future.cancel()
+        future = None
+
+    answer_query = query
+    if future is not None:
+        try:
+            refined = future.result(timeout=REFINE_TIMEOUT)
+        except Exception:
+            # Drop it if it is still queued behind other chats
+            future.cancel()
+            refined = None
+
+        if refined and refined != query:
+            yield json.dumps({"original": query, "refined": refined}, ensure_ascii=False)
+            if ix is not None and differs_meaningfully(ix, query, refined):
+                results = merge_results(search(ix, refined, limit=limit), results, limit)
+            answer_query = refined
+
+    yield from generate_ai_response(answer_query, results, history)
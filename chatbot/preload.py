@@ -0,0 +1,113 @@
+"""記憶體預載：在 fork 之前將索引與條文載入記憶體，讓各 worker 共用"""
+
+import gc
+import json
+import os
+
+from shutil import copyfileobj
+
+from whoosh.filedb.filestore import RamStorage
+from whoosh.query import Term
+
+from indexer import get_index
+from searcher import format_hit
+from renderer import attach_html
+
+
+# Fields reported from /proc/self/smaps_rollup, in kB
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty",
+                "Private_Clean", "Private_Dirty")
+
+
+class PreloadedIndex:
+    """Read-only, in-memory copy of the index and the article payloads.
+
+    ``articles`` maps article number to the UTF-8 JSON body served by
+    ``/api/article``; keeping each one as a single bytes object means a
+    worker only touches its header page, so the payload pages stay shared
+    under copy-on-write.
+    """
+
+    def __init__(self, ix, articles, generation):
+        self.ix = ix
+        self.articles = articles
+        self.generation = generation
+
+    def article_payload(self, number):
+        return self.articles.get(str(number))
+
+
+def load_index_to_ram(ix):
+    """Copy an on-disk index into RamStorage and open it there.
+
+    Only the index's own TOC and segment files are copied; the lock file and
+    anything else stored beside the index (suggest.json, html/) are skipped.
+    """
+    toc_prefix = f"_{ix.indexname}_"
+    segment_prefix = f"{ix.indexname}_"
+    lock_name = f"{ix.indexname}_WRITELOCK"
+
+    ram = RamStorage()
+    for name in ix.storage.list():
+        if name == lock_name:
+            continue
+        if not (name.startswith(toc_prefix) or name.startswith(segment_prefix)):
+            continue
+        with ix.storage.open_file(name) as source:
+            with ram.create_file(name) as dest:
+                copyfileobj(source, dest)
+    return ram.open_index(ix.indexname)
+
+
+def load_article_payloads(ix, index_dir):
+    """Serialize every article exactly as /api/article would return it."""
+    payloads = {}
+    with ix.searcher() as searcher:
+        numbers = {hit.get("article_number", "")
+                   for hit in searcher.search(Term("doc_type", "article"), limit=None)}
+        for number in sorted(n for n in numbers if n):
+            results = searcher.search(Term("article_number", number), limit=1)
+            if results:
+                result = attach_html(format_hit(results[0]), index_dir)
+                payload = json.dumps(result, ensure_ascii=False)
+                payloads[number] = payload.encode("utf-8")
+    return payloads
+
+
+def preload_index(index_dir):
+    """Load the index and article payloads into memory, or return None.
+
+    Call this in the master process before workers fork (e.g. gunicorn
+    ``--preload``). The loaded objects are moved to the permanent GC
+    generation so collections in the workers do not write to their pages.
+    """
+    disk_ix = get_index(index_dir)
+    if disk_ix is None:
+        return None
+
+    generation = disk_ix.latest_generation()
+    ix = load_index_to_ram(disk_ix)
+    articles = load_article_payloads(ix, index_dir)
+
+    gc.collect()
+    gc.freeze()
+    return PreloadedIndex(ix, articles, generation)
+
+
+def memory_report():
+    """Return this process's resident memory breakdown in kB."""
+    report = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in SMAPS_FIELDS:
+                    report[name.lower() + "_kb"] = int(rest.split()[0])
+    except OSError:
+        # Not Linux: peak RSS where the resource module exists (not Windows)
+        try:
+            import resource
+        except ImportError:
+            return report
+        report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
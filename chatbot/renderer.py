@@ -0,0 +1,180 @@
+"""Markdown 預先轉換：建立索引時將條文與學習資源轉為安全的 HTML 片段"""
+
+import re
+import html
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+
+# Rendered fragments live in this directory next to the Whoosh index
+HTML_DIR = "html"
+
+# Article sections rendered as markdown (legal text is rendered as plain text)
+MARKDOWN_SECTIONS = ("explanation", "summary", "cases")
+
+# Study cards show the same preview length as format_hit's raw_content
+STUDY_PREVIEW_CHARS = 2000
+
+# Fragments the search/chat result cards render; /api/article gets them all
+CARD_SECTIONS = ("legal_text", "explanation", "content")
+
+# Bump when rendering changes so unchanged sources are re-rendered
+RENDER_VERSION = 2
+
+# Loaded fragments, keyed by file path -> (mtime_ns, fragments)
+_fragment_cache = {}
+_fragment_lock = threading.Lock()
+
+# URL schemes allowed in links and images
+SAFE_SCHEMES = ("http:", "https:", "mailto:")
+
+
+class _SafeLinks(Treeprocessor):
+    """Drop href/src attributes that use a scriptable URL scheme."""
+
+    def run(self, root):
+        for el in root.iter():
+            for attr in ("href", "src"):
+                url = el.get(attr)
+                if url is None:
+                    continue
+                # Browsers ignore whitespace/control chars inside the scheme
+                url = re.sub(r'[\x00-\x20]', '', url).lower()
+                if ":" in url.split("/", 1)[0] and not url.startswith(SAFE_SCHEMES):
+                    del el.attrib[attr]
+
+
+class SanitizeExtension(Extension):
+    """Treat raw HTML in markdown as text and strip unsafe link targets."""
+
+    def extendMarkdown(self, md):
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        md.treeprocessors.register(_SafeLinks(md), "safe_links", 0)
+
+
+def render_markdown(text):
+    """Render markdown to a sanitized HTML fragment."""
+    if not text:
+        return ""
+    return markdown.markdown(text, extensions=["tables", SanitizeExtension()])
+
+
+def render_plain(text):
+    """Escape plain text for display inside an HTML element."""
+    return html.escape(text) if text else ""
+
+
+def fragment_path(index_dir, rel_path):
+    """Location of the rendered fragments for a knowledge-base file."""
+    return Path(index_dir) / HTML_DIR / Path(rel_path).with_suffix(".json")
+
+
+def source_hash(content):
+    raw = f"{RENDER_VERSION}:{content}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def write_fragments(index_dir, rel_path, content, render):
+    """Write fragments for ``rel_path`` unless ``content`` is unchanged.
+
+    ``render`` is called only when the source hash differs from the stored
+    one. Returns True if the file was (re)rendered.
+    """
+    path = fragment_path(index_dir, rel_path)
+    digest = source_hash(content)
+    try:
+        if json.loads(path.read_text(encoding="utf-8")).get("source_hash") == digest:
+            return False
+    except (OSError, ValueError):
+        pass
+
+    fragments = render()
+    fragments["source_hash"] = digest
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(fragments, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(path)
+    return True
+
+
+def render_article_fragments(legal_text, sections):
+    """Render the displayed sections of an article."""
+    fragments = {"legal_text": render_plain(legal_text)}
+    for name in MARKDOWN_SECTIONS:
+        fragments[name] = render_markdown(sections.get(name, ""))
+    return fragments
+
+
+def render_study_fragments(content):
+    """Render the preview of a study document shown on its card."""
+    return {"content": render_markdown(content[:STUDY_PREVIEW_CHARS])}
+
+
+def remove_fragments(index_dir, rel_path):
+    fragment_path(index_dir, rel_path).unlink(missing_ok=True)
+
+
+def prune_fragments(index_dir, keep):
+    """Delete fragment files whose source is no longer in ``keep`` (rel paths)."""
+    root = Path(index_dir) / HTML_DIR
+    if not root.exists():
+        return
+    wanted = {fragment_path(index_dir, p) for p in keep}
+    for path in root.rglob("*.json"):
+        if path not in wanted:
+            path.unlink()
+
+
+def load_fragments(index_dir, rel_path):
+    """Return the stored fragments for ``rel_path``, or None.
+
+    Parsed files are cached in memory until their mtime changes.
+    """
+    path = fragment_path(index_dir, rel_path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    key = str(path)
+    with _fragment_lock:
+        cached = _fragment_cache.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        fragments = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    fragments.pop("source_hash", None)
+    with _fragment_lock:
+        _fragment_cache[key] = (mtime, fragments)
+    return fragments
+
+
+def attach_html(result, index_dir, sections=None):
+    """Add pre-rendered ``html`` fragments to an article/study result dict.
+
+    ``sections`` limits which fragments are attached; None attaches all.
+    """
+    if result and result.get("path"):
+        fragments = load_fragments(index_dir, result["path"])
+        if fragments is not None:
+            if sections is not None:
+                fragments = {k: v for k, v in fragments.items() if k in sections}
+            result["html"] = fragments
+    return result
+
+
+def attach_html_all(results, index_dir):
+    """attach_html for every hit in a result list, card fragments only."""
+    for result in results:
+        attach_html(result, index_dir, CARD_SECTIONS)
+    return results
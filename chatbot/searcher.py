@@ -1,14 +1,38 @@
 """搜尋邏輯：條號偵測、全文搜尋、排序"""
 
 import re
+import json
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from whoosh.qparser import MultifieldParser, OrGroup
 from whoosh.query import Term
+from whoosh.idsets import BitSet
 from whoosh import scoring
 
 
 # Regex to detect article number queries
 ARTICLE_NUM_RE = re.compile(r'第?\s*(\d+(?:-\d+)?)\s*條?')
 
+# Fields searched by the full-text query parser
+SEARCH_FIELDS = ["legal_text", "explanation", "summary", "cases", "tags", "full_text"]
+
+# Filter names accepted by search_page, mapped to the stored field they match
+FILTER_FIELDS = {
+    "chapter": "chapter",
+    "section": "section",
+    "status": "status",
+    "doc_type": "doc_type",
+    "tags": "tags",
+    "law": "law_name",
+}
+
+# Per-value docnum bitsets, keyed by (index folder, index name, generation)
+_filter_cache = {}
+_filter_lock = threading.Lock()
+
 
 def detect_article_number(query):
     """Try to extract an article number from the query."""
@@ -21,36 +45,199 @@ def detect_article_number(query):
     return None
 
 
+def make_parser(ix):
+    """Build the multi-field query parser used for full-text search."""
+    return MultifieldParser(SEARCH_FIELDS, schema=ix.schema, group=OrGroup)
+
+
+def query_results(searcher, parser, query, limit=10, mask=None):
+    """Run one query against an open searcher and return Whoosh results."""
+    # Check if query is an article number lookup
+    art_num = detect_article_number(query)
+    if art_num:
+        results = searcher.search(Term("article_number", art_num), limit=1,
+                                  filter=mask)
+        if results:
+            return results
+
+    # Full-text search
+    qobj = parser.parse(query)
+    return searcher.search(qobj, limit=limit, filter=mask)
+
+
+def run_query(searcher, parser, query, limit=10):
+    """Run one query against an open searcher and return formatted hits."""
+    return [format_hit(hit) for hit in query_results(searcher, parser, query, limit)]
+
+
 def search(ix, query, limit=10):
     """Search the index and return results."""
     if ix is None:
         return []
 
-    results_list = []
+    with ix.searcher(weighting=scoring.BM25F()) as searcher:
+        return run_query(searcher, make_parser(ix), query, limit)
+
+
+def iter_search_many(ix, queries, limit=10, workers=1):
+    """Search many queries with one shared parser, yielding results in order.
+
+    With ``workers`` > 1 the queries fan out over a thread pool; each worker
+    thread opens a single searcher and reuses it for all of its queries.
+    """
+    if ix is None:
+        for _ in queries:
+            yield []
+        return
+
+    parser = make_parser(ix)
+
+    if workers <= 1:
+        with ix.searcher(weighting=scoring.BM25F()) as searcher:
+            for query in queries:
+                yield run_query(searcher, parser, query, limit) if query else []
+        return
+
+    local = threading.local()
+    opened = []
+    lock = threading.Lock()
+
+    def run(query):
+        if not query:
+            return []
+        searcher = getattr(local, "searcher", None)
+        if searcher is None:
+            searcher = local.searcher = ix.searcher(weighting=scoring.BM25F())
+            with lock:
+                opened.append(searcher)
+        return run_query(searcher, parser, query, limit)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for results in pool.map(run, queries):
+                yield results
+    finally:
+        for searcher in opened:
+            searcher.close()
+
+
+def search_many(ix, queries, limit=10, workers=1):
+    """Search a list of queries and return a list of result lists."""
+    return list(iter_search_many(ix, queries, limit=limit, workers=workers))
+
+
+def _build_bitsets(reader, field):
+    """Map each stored value of ``field`` to a bitset of matching docnums."""
+    docnums = {}
+    for docnum, stored in reader.iter_docs():
+        value = str(stored.get(field) or "")
+        values = value.split(",") if field == "tags" else [value]
+        for v in values:
+            v = v.strip()
+            if v:
+                docnums.setdefault(v, []).append(docnum)
+
+    size = reader.doc_count_all()
+    return {v: BitSet(nums, size=size) for v, nums in docnums.items()}
+
+
+def get_filter_bitsets(ix, searcher, field):
+    """Return cached value -> bitset map for ``field`` at the searcher's generation."""
+    # RamStorage has an empty folder, so fall back to the storage identity
+    folder = getattr(ix.storage, "folder", "") or id(ix.storage)
+    key = (folder, ix.indexname, searcher.reader().generation())
+
+    with _filter_lock:
+        cached = _filter_cache.get(key)
+        if cached is None:
+            # Bitsets from older generations of this index are stale
+            for old in [k for k in _filter_cache if k[:2] == key[:2]]:
+                del _filter_cache[old]
+            cached = _filter_cache[key] = {}
+        if field not in cached:
+            cached[field] = _build_bitsets(searcher.reader(), field)
+        return cached[field]
+
+
+def build_filter(ix, searcher, filters):
+    """Combine structured filters into one docnum bitset, or None if unfiltered.
+
+    ``tags`` accepts a comma-separated list; every tag must match.
+    """
+    mask = None
+    for name, value in (filters or {}).items():
+        if not value:
+            continue
+        if name not in FILTER_FIELDS:
+            raise ValueError(f"不支援的篩選條件：{name}")
+
+        field = FILTER_FIELDS[name]
+        values = value.split(",") if name == "tags" else [value]
+        bitsets = get_filter_bitsets(ix, searcher, field)
+        for v in values:
+            bits = bitsets.get(v.strip(), BitSet())
+            mask = bits if mask is None else mask.intersection(bits)
+    return mask
+
+
+def _fingerprint(query, filters):
+    """Short digest tying a cursor to the query and filters it was issued for."""
+    active = {k: v for k, v in (filters or {}).items() if v}
+    raw = json.dumps([query, active], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(generation, offset, fingerprint):
+    """Encode a paging position as an opaque URL-safe cursor."""
+    raw = json.dumps({"g": generation, "o": offset, "f": fingerprint})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, generation, fingerprint):
+    """Return the offset stored in ``cursor``, or raise ValueError if it is stale."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset = int(data["o"])
+    except Exception:
+        raise ValueError("無效的分頁游標")
+
+    if data.get("f") != fingerprint or offset < 0:
+        raise ValueError("分頁游標與查詢不符")
+    if data.get("g") != generation:
+        raise ValueError("索引已更新，請重新搜尋")
+    return offset
+
+
+def search_page(ix, query, limit=10, filters=None, cursor=None):
+    """Search with structured filters and cursor-based paging.
+
+    Returns a dict with ``results``, ``total`` and ``next_cursor`` (None on the
+    last page). Cursors are only valid for the index generation they came from.
+    """
+    if ix is None:
+        return {"results": [], "total": 0, "next_cursor": None}
+
+    fingerprint = _fingerprint(query, filters)
 
     with ix.searcher(weighting=scoring.BM25F()) as searcher:
-        # Check if query is an article number lookup
-        art_num = detect_article_number(query)
-        if art_num:
-            results = searcher.search(Term("article_number", art_num), limit=1)
-            if results:
-                for hit in results:
-                    results_list.append(format_hit(hit))
-                return results_list
-
-        # Full-text search
-        parser = MultifieldParser(
-            ["legal_text", "explanation", "summary", "cases", "tags", "full_text"],
-            schema=ix.schema,
-            group=OrGroup,
-        )
-        qobj = parser.parse(query)
-        results = searcher.search(qobj, limit=limit)
-
-        for hit in results:
-            results_list.append(format_hit(hit))
-
-    return results_list
+        generation = searcher.reader().generation()
+        offset = decode_cursor(cursor, generation, fingerprint) if cursor else 0
+        mask = build_filter(ix, searcher, filters)
+        if mask is not None and not mask:
+            # Whoosh treats an empty filter as "no filter"
+            return {"results": [], "total": 0, "next_cursor": None}
+
+        results = query_results(searcher, make_parser(ix), query,
+                                limit=offset + limit, mask=mask)
+        hits = [format_hit(hit) for hit in results[offset:offset + limit]]
+        total = len(results)
+
+    next_cursor = None
+    if offset + limit < total:
+        next_cursor = encode_cursor(generation, offset + limit, fingerprint)
+
+    return {"results": hits, "total": total, "next_cursor": next_cursor}
 
 
 def format_hit(hit):
@@ -307,14 +307,16 @@ function createArticleCard(result, autoExpand) {
         body.innerHTML = '<p style="color:#c53030;margin-top:8px">本條已刪除。</p>';
     } else {
         let html = '';
+        // Pre-rendered fragments attached by the server skip client-side parsing
+        const rendered = result.html || {};
 
         if (result.legal_text) {
             html += `<div class="section-label">條文原文</div>
-                     <div class="legal-text">${escapeHtml(result.legal_text)}</div>`;
+                     <div class="legal-text">${rendered.legal_text ?? escapeHtml(result.legal_text)}</div>`;
         }
         if (result.explanation) {
             html += `<div class="section-label">白話解說</div>
-                     <div class="explanation">${marked.parse(result.explanation)}</div>`;
+                     <div class="explanation">${rendered.explanation ?? marked.parse(result.explanation)}</div>`;
         }
         if (result.tags) {
             const tags = result.tags.split(',').map(t => t.trim()).filter(Boolean);
@@ -361,7 +363,8 @@ function createStudyCard(result) {
     const body = document.createElement('div');
     body.className = 'article-card-body';
     const content = result.raw_content || '';
-    body.innerHTML = `<div class="explanation">${marked.parse(content.substring(0, 2000))}</div>`;
+    const rendered = result.html && result.html.content;
+    body.innerHTML = `<div class="explanation">${rendered ?? marked.parse(content.substring(0, 2000))}</div>`;
     card.appendChild(body);
 
     return card;
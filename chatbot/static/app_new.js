@@ -16,6 +16,10 @@ let searchFilters = {
     status: 'active'
 };
 
+// Static bundle from exporter.py; keyword search runs in the browser when it loads
+const OFFLINE_BUNDLE_URL = '/static_export';
+let offlineKb = null;
+
 // ── DOM Elements ──
 const chatArea = document.getElementById('chatArea');
 const messagesEl = document.getElementById('messages');
@@ -35,6 +39,7 @@ const scrollProgress = document.getElementById('scrollProgress');
 // ── Initialization ──
 document.addEventListener('DOMContentLoaded', () => {
     checkStatus();
+    loadOfflineBundle();
     loadStoredData();
     initializeEventListeners();
     autoResizeTextarea();
@@ -137,6 +142,15 @@ function handleScroll() {
 }
 
 // ── Status Check ──
+async function loadOfflineBundle() {
+    try {
+        offlineKb = await OfflineSearch.load(OFFLINE_BUNDLE_URL);
+    } catch (e) {
+        // No export published; search mode keeps using the server
+        offlineKb = null;
+    }
+}
+
 async function checkStatus() {
     try {
         const res = await fetch('/api/status');
@@ -199,27 +213,14 @@ async function sendMessage(query) {
     // Track query
     trackQuery(query, currentMode);
 
-    // Try to refine question in AI mode
-    let refinedQuery = query;
-    let showRefinement = false;
-
-    if (currentMode === 'ai') {
-        const refineResult = await refineQuestion(query);
-        if (refineResult && refineResult.success && refineResult.refined !== query) {
-            refinedQuery = refineResult.refined;
-            showRefinement = true;
-            // Show refined question
-            addRefinedMessage(query, refinedQuery);
-        }
-    }
-
     const typingEl = addTypingIndicator();
 
     try {
         if (currentMode === 'ai') {
-            await handleAIResponse(refinedQuery, typingEl);
+            // The server refines the question while it searches (refine: true)
+            await handleAIResponse(query, typingEl);
         } else {
-            await handleSearchResponse(refinedQuery, typingEl);
+            await handleSearchResponse(query, typingEl);
         }
     } catch (error) {
         removeElement(typingEl);
@@ -231,32 +232,28 @@ async function sendMessage(query) {
     chatInput.focus();
 }
 
-// ── Refine Question ──
-async function refineQuestion(query) {
-    try {
-        const res = await fetch('/api/refine', {
+// ── Search Mode ──
+async function handleSearchResponse(query, typingEl) {
+    // Article-number lookups need the server's exact match; keyword
+    // queries are answered from the static bundle when it is available
+    let data = null;
+    if (offlineKb && !/\d/.test(query)) {
+        try {
+            const hits = offlineKb.search(query, 10);
+            data = { results: await Promise.all(hits.map(hit => offlineKb.getDoc(hit))) };
+        } catch (e) {
+            data = null;
+        }
+    }
+    if (!data) {
+        const res = await fetch('/api/chat', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ query }),
+            body: JSON.stringify({ message: query, mode: 'search' }),
         });
-
-        if (!res.ok) return null;
-        return await res.json();
-    } catch (error) {
-        console.error('Question refinement failed:', error);
-        return null;
+        data = await res.json();
     }
-}
-
-// ── Search Mode ──
-async function handleSearchResponse(query, typingEl) {
-    const res = await fetch('/api/chat', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: query, mode: 'search' }),
-    });
 
-    const data = await res.json();
     removeElement(typingEl);
 
     if (data.results && data.results.length > 0) {
@@ -291,6 +288,7 @@ async function handleAIResponse(query, typingEl) {
         body: JSON.stringify({
             message: query,
             mode: 'ai',
+            refine: true,
             history: conversationHistory,
         }),
     });
@@ -320,7 +318,12 @@ async function handleAIResponse(query, typingEl) {
                 if (data === '[DONE]') continue;
                 try {
                     const parsed = JSON.parse(data);
-                    if (parsed.text) {
+                    if (parsed.refined) {
+                        // Show the refined question above the answer
+                        query = parsed.refined;
+                        const refinedEl = addRefinedMessage(parsed.original, parsed.refined);
+                        messagesEl.insertBefore(refinedEl, msgEl);
+                    } else if (parsed.text) {
                         aiText += parsed.text;
                         bubble.innerHTML = marked.parse(aiText);
                         scrollToBottom();
@@ -508,14 +511,16 @@ function createArticleCard(result, autoExpand) {
         body.innerHTML = '<p style="color:#f5576c;margin-top:8px">本條已刪除。</p>';
     } else {
         let html = '';
+        // Pre-rendered fragments attached by the server skip client-side parsing
+        const rendered = result.html || {};
 
         if (result.legal_text) {
             html += `<div class="section-label">條文原文</div>
-                     <div class="legal-text">${escapeHtml(result.legal_text)}</div>`;
+                     <div class="legal-text">${rendered.legal_text ?? escapeHtml(result.legal_text)}</div>`;
         }
         if (result.explanation) {
             html += `<div class="section-label">白話解說</div>
-                     <div class="explanation">${marked.parse(result.explanation)}</div>`;
+                     <div class="explanation">${rendered.explanation ?? marked.parse(result.explanation)}</div>`;
         }
         if (result.tags) {
             const tags = result.tags.split(',').map(t => t.trim()).filter(Boolean);
@@ -633,7 +638,8 @@ function createStudyCard(result) {
     const body = document.createElement('div');
     body.className = 'article-card-body';
     const content = result.raw_content || '';
-    body.innerHTML = `<div class="explanation">${marked.parse(content.substring(0, 2000))}</div>`;
+    const rendered = result.html && result.html.content;
+    body.innerHTML = `<div class="explanation">${rendered ?? marked.parse(content.substring(0, 2000))}</div>`;
     card.appendChild(body);
 
     return card;
@@ -0,0 +1,90 @@
+// ========================================
+// 離線搜尋 - 讀取 exporter.py 匯出的靜態索引
+// ========================================
+
+// Usage:
+//   const kb = await OfflineSearch.load('/static_export');
+//   const hits = kb.search('董事責任', 10);   // [{docid, score, title, path, shard}]
+//   const doc = await kb.getDoc(hits[0]);     // full article/study record
+
+const OfflineSearch = (() => {
+    // Same BM25F defaults as Whoosh
+    const K1 = 1.2;
+    const B = 0.75;
+    const MAX_TERM_LENGTH = 8;
+
+    async function fetchJson(url) {
+        const res = await fetch(url);
+        if (!res.ok) throw new Error(`${url}: ${res.status}`);
+        return res.json();
+    }
+
+    async function load(baseUrl) {
+        const { version } = await fetchJson(`${baseUrl}/latest.json`);
+        const root = `${baseUrl}/${version}`;
+        const manifest = await fetchJson(`${root}/manifest.json`);
+        const index = await fetchJson(`${root}/${manifest.search}`);
+        const shardCache = {};
+
+        const lengths = index.lengths;
+        const avgLength = lengths.reduce((a, b) => a + b, 0) / (lengths.length || 1);
+
+        // jieba is not available in the browser; greedy forward maximum
+        // matching against the exported term list is close enough
+        function tokenize(query) {
+            const text = query.replace(/\s+/g, '');
+            const tokens = [];
+            let i = 0;
+            while (i < text.length) {
+                // Exported terms are lowercased, so match on the lowercased key
+                let matched = '';
+                for (let n = Math.min(MAX_TERM_LENGTH, text.length - i); n > 0; n--) {
+                    const piece = text.substr(i, n).toLowerCase();
+                    if (index.terms[piece]) {
+                        matched = piece;
+                        break;
+                    }
+                }
+                if (matched) tokens.push(matched);
+                i += matched.length || 1;
+            }
+            return tokens;
+        }
+
+        function search(query, limit = 10) {
+            const N = lengths.length;
+            const scores = new Map();
+            for (const token of tokenize(query)) {
+                const postings = index.terms[token];
+                if (!postings) continue;
+                const df = postings.length / 2;
+                const idf = Math.log(1 + (N - df + 0.5) / (df + 0.5));
+                for (let p = 0; p < postings.length; p += 2) {
+                    const doc = postings[p];
+                    const tf = postings[p + 1];
+                    const norm = tf + K1 * (1 - B + B * lengths[doc] / avgLength);
+                    scores.set(doc, (scores.get(doc) || 0) + idf * tf * (K1 + 1) / norm);
+                }
+            }
+            return [...scores.entries()]
+                .sort((a, b) => b[1] - a[1])
+                .slice(0, limit)
+                .map(([docid, score]) => {
+                    const [shard, position, title, path] = index.docs[docid];
+                    return { docid, score, title, path, shard, position };
+                });
+        }
+
+        async function getDoc(hit) {
+            if (!shardCache[hit.shard]) {
+                shardCache[hit.shard] = fetchJson(`${root}/${manifest.shards[hit.shard]}`);
+            }
+            const shard = await shardCache[hit.shard];
+            return shard.docs[hit.position];
+        }
+
+        return { version, manifest, tokenize, search, getDoc };
+    }
+
+    return { load };
+})();
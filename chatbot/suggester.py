@@ -0,0 +1,178 @@
+"""自動完成：建立索引時產生前綴詞表，查詢時以 bisect 取出候選"""
+
+import os
+import re
+import argparse
+import json
+import heapq
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+
+# Prefix table written next to the Whoosh index
+SUGGEST_FILE = "suggest.json"
+
+# Columns per row: key, text, type, popularity, article_number, law_name
+ROW_WIDTH = 6
+
+# FAQ questions in study/faq.md look like "### Q1: ..."
+FAQ_QUESTION_RE = re.compile(r'^###\s*Q\d+[:：]\s*(.+)$', re.MULTILINE)
+
+# Loaded prefix tables, keyed by file path -> (mtime, SuggestIndex)
+_suggest_cache = {}
+_suggest_lock = threading.Lock()
+
+
+def normalize(text):
+    """Normalize text for prefix matching: drop whitespace, lowercase."""
+    return re.sub(r'\s+', '', text).lower()
+
+
+def collect_suggestions(ix, kb_root, glossary_terms=None):
+    """Collect (text, type, popularity, article_number, law_name) entries.
+
+    Articles are keyed by (law_name, article_number) so the same number in
+    different laws stays distinct. Popularity is corpus-derived: articles
+    count inbound related links within their law, tags count tagged
+    documents, glossary terms count articles mentioning them.
+    """
+    kb_root = Path(kb_root)
+    articles = {}
+    inbound = {}
+    tag_counts = {}
+    texts = []
+
+    with ix.searcher() as searcher:
+        for stored in searcher.all_stored_fields():
+            if stored.get("doc_type") == "article":
+                law = stored.get("law_name", "")
+                number = stored.get("article_number", "")
+                articles[(law, number)] = stored.get("article_display", "") or number
+                texts.append(f"{stored.get('legal_text', '')} {stored.get('explanation', '')}")
+                for rel in stored.get("related", []):
+                    key = (law, rel.get("number"))
+                    inbound[key] = inbound.get(key, 0) + 1
+            for tag in (stored.get("tags") or "").split(","):
+                tag = tag.strip()
+                if tag:
+                    tag_counts[tag] = tag_counts.get(tag, 0) + 1
+
+    entries = []
+    for (law, number), display in articles.items():
+        entries.append((display, "article", 1 + inbound.get((law, number), 0), number, law))
+    for tag, count in tag_counts.items():
+        entries.append((tag, "tag", count, "", ""))
+
+    for term in dict.fromkeys(glossary_terms or []):
+        count = sum(1 for t in texts if term in t)
+        entries.append((term, "term", 1 + count, "", ""))
+
+    faq_path = kb_root / "study" / "faq.md"
+    if faq_path.exists():
+        content = faq_path.read_text(encoding="utf-8")
+        for question in FAQ_QUESTION_RE.findall(content):
+            entries.append((question.strip(), "faq", 1, "", ""))
+
+    return entries
+
+
+def build_suggest_index(ix, kb_root, index_dir, glossary_terms=None):
+    """Build the sorted prefix table and write it next to the index."""
+    rows = []
+    for text, kind, weight, number, law in collect_suggestions(ix, kb_root, glossary_terms):
+        keys = {normalize(text)}
+        if number:
+            # Let "19" and "第19條" both complete to "第 19 條"
+            keys.add(normalize(number))
+        for key in keys:
+            if key:
+                rows.append([key, text, kind, weight, number, law])
+
+    rows.sort()
+    # Write to a temp file and rename so readers never see a partial table
+    path = Path(index_dir) / SUGGEST_FILE
+    tmp_path = path.with_name(f"{SUGGEST_FILE}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(rows, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class SuggestIndex:
+    """Sorted array of normalized keys, searched by prefix with bisect."""
+
+    def __init__(self, rows):
+        self.keys = [row[0] for row in rows]
+        self.rows = rows
+        # One-character prefixes span the widest ranges; memoize their results
+        self._short = {}
+
+    def suggest(self, prefix, limit=8):
+        """Return up to ``limit`` completions for ``prefix``, most popular first."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) == 1:
+            cached = self._short.get((prefix, limit))
+            if cached is None:
+                cached = self._short[(prefix, limit)] = self._lookup(prefix, limit)
+            return cached
+        return self._lookup(prefix, limit)
+
+    def _lookup(self, prefix, limit):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        # Exact matches first; the same text can appear under a few keys/types,
+        # so over-fetch before de-duplicating
+        ranked = heapq.nsmallest(
+            limit * 3, self.rows[lo:hi],
+            key=lambda row: (row[0] != prefix, -row[3], len(row[1])),
+        )
+
+        suggestions = []
+        seen = set()
+        for _, text, kind, weight, number, law in ranked:
+            if (text, law) in seen:
+                continue
+            seen.add((text, law))
+            suggestions.append({"text": text, "type": kind,
+                                "article_number": number, "law_name": law})
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+
+def get_suggest_index(index_dir):
+    """Load the prefix table for ``index_dir``, reloading it when the file changes."""
+    path = Path(index_dir) / SUGGEST_FILE
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+
+    with _suggest_lock:
+        cached = _suggest_cache.get(str(path))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        rows = json.loads(path.read_text(encoding="utf-8"))
+        if rows and len(rows[0]) != ROW_WIDTH:
+            # Written by an older version without law_name; rebuild it
+            return None
+        suggester = SuggestIndex(rows)
+        _suggest_cache[str(path)] = (mtime, suggester)
+        return suggester
+
+
+if __name__ == "__main__":
+    from indexer import get_index, load_glossary_terms
+
+    parser = argparse.ArgumentParser(description="建立自動完成前綴詞表")
+    parser.add_argument("--index-dir", default=str(Path(__file__).resolve().parent / "multi_law_index"))
+    parser.add_argument("--kb-root", default=str(Path(__file__).resolve().parent.parent))
+    args = parser.parse_args()
+
+    ix = get_index(args.index_dir)
+    if ix is None:
+        raise SystemExit(f"找不到索引：{args.index_dir}")
+    count = build_suggest_index(ix, args.kb_root, args.index_dir, load_glossary_terms(Path(args.kb_root)))
+    print(f"已建立 {count} 筆自動完成項目 → {Path(args.index_dir) / SUGGEST_FILE}")
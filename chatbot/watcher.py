@@ -0,0 +1,108 @@
+"""知識庫監看：偵測 markdown 變更，於背景執行緒增量更新索引"""
+
+import os
+import time
+import threading
+from pathlib import Path
+
+from indexer import (build_index, update_index, get_index, check_schema,
+                     iter_article_files, iter_study_files)
+
+
+KB_ROOT = Path(__file__).resolve().parent.parent
+# Single-law index owned by indexer.py; the multi-law index the app serves
+# by default has its own builder and cannot be updated from here
+INDEX_DIR = Path(__file__).resolve().parent / "index_data"
+
+# Files whose change affects tokenization of every document
+FULL_REBUILD_FILES = {"glossary.md"}
+
+
+class IndexWatcher(threading.Thread):
+    """Poll the knowledge base for changes and re-index them in the background.
+
+    Changes are collected until the tree has been quiet for ``debounce``
+    seconds, then committed to the index as a single new generation.
+    Raises ValueError if the existing index was built with another schema,
+    since re-indexing it from here would drop documents from other laws.
+    """
+
+    def __init__(self, kb_root, index_dir, interval=1.0, debounce=2.0):
+        super().__init__(name="index-watcher", daemon=True)
+        ix = get_index(index_dir)
+        if ix is not None:
+            check_schema(ix)
+        self.kb_root = Path(kb_root).resolve()
+        self.index_dir = Path(index_dir)
+        self.interval = interval
+        self.debounce = debounce
+        self._stop_event = threading.Event()
+        # Baseline taken up front so edits made right after start() are seen
+        self._previous = self.snapshot()
+
+    def snapshot(self):
+        """Return {path: mtime} for every watched file."""
+        mtimes = {}
+        for files in (iter_article_files(self.kb_root), iter_study_files(self.kb_root)):
+            for md_file in files:
+                try:
+                    mtimes[md_file] = md_file.stat().st_mtime_ns
+                except OSError:
+                    continue
+        return mtimes
+
+    def run(self):
+        previous = self._previous
+        pending = set()
+        last_change = 0.0
+
+        while not self._stop_event.wait(self.interval):
+            current = self.snapshot()
+            changed = {p for p in previous.keys() | current.keys()
+                       if previous.get(p) != current.get(p)}
+            previous = current
+
+            if changed:
+                pending |= changed
+                last_change = time.monotonic()
+            elif pending and time.monotonic() - last_change >= self.debounce:
+                self.reindex(pending)
+                pending = set()
+
+    def reindex(self, paths):
+        """Re-index the changed files, or everything if the glossary changed."""
+        started = time.monotonic()
+        try:
+            if any(p.name in FULL_REBUILD_FILES for p in paths):
+                build_index(self.kb_root, self.index_dir)
+            else:
+                update_index(self.kb_root, self.index_dir, paths)
+        except Exception as e:
+            print(f"Reindex error: {e}")
+            return
+        elapsed = time.monotonic() - started
+        print(f"已更新索引：{len(paths)} 個檔案（{elapsed:.1f} 秒）")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+if __name__ == "__main__":
+    kb_root = Path(os.environ.get("KB_ROOT", KB_ROOT))
+    index_dir = Path(os.environ.get("INDEX_DIR", INDEX_DIR))
+    if get_index(index_dir) is None:
+        print(f"建立索引 {index_dir} ...")
+        build_index(kb_root, index_dir)
+    print(f"監看 {kb_root} → {index_dir}（Ctrl+C 結束）")
+
+    try:
+        watcher = IndexWatcher(kb_root, index_dir)
+    except ValueError as e:
+        print(f"無法啟用監看：{e}")
+        raise SystemExit(1)
+    watcher.start()
+    try:
+        while watcher.is_alive():
+            watcher.join(1.0)
+    except KeyboardInterrupt:
+        watcher.stop()